@@ -1,14 +1,43 @@
+import asyncio
+import hashlib
 import os
 import re
-import requests
-from bs4 import BeautifulSoup
+import time
+import httpx
+import orjson
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from urllib.parse import urljoin
 from datetime import datetime
 from io import BytesIO
-from PyPDF2 import PdfReader
+import pypdfium2 as pdfium
 
 # Configurações
 URL = "https://www.sds.pe.gov.br/mais/boletim-geral"
 LAST_ID_FILE = "last_bgsds_id.txt"
+ETAG_FILE = "last_bgsds_etag.txt"
+PDF_CACHE_DIR = "pdf_cache"
+PDF_CACHE_MAX_IDADE = 7 * 24 * 3600  # descarta textos com mais de 7 dias
+PDF_CABECALHO_BYTES = 512 * 1024  # quanto baixar na tentativa parcial
+
+def _novo_cliente():
+    """Cliente HTTP assíncrono único (keep-alive): reaproveita a conexão entre
+    o site da SDS e a API do Telegram, evitando um handshake TLS novo a cada
+    chamada, e permite sobrepor o download do PDF com outras requisições."""
+    return httpx.AsyncClient(
+        # HTTP/2: multiplexa requisições na mesma conexão e comprime os
+        # cabeçalhos (HPACK); cai para HTTP/1.1 se o servidor não suportar.
+        http2=True,
+        timeout=60,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+        headers={
+            "User-Agent": "monitor-bgsds/1.0",
+            # Pede resposta comprimida; o httpx descomprime sozinho (br requer
+            # o pacote brotli instalado). O HTML cai ~5-10x em bytes trafegados.
+            "Accept-Encoding": "gzip, deflate, br",
+        },
+    )
 
 # 🔎 Ajuste suas palavras-chave aqui
 KEYWORDS = [
@@ -17,68 +46,124 @@ KEYWORDS = [
     # adicione outras palavras aqui
 ]
 
+# Uma regex case-insensitive compilada por palavra-chave: cada busca varre o
+# texto original (sem alocar a cópia .lower() do texto inteiro) e para no
+# primeiro acerto. Padrões separados, e não uma alternação única, porque a
+# alternação muda a semântica: finditer consome o trecho casado e esconde
+# palavras que se sobrepõem, e no mesmo ponto só o primeiro ramo casa —
+# sombreia palavras com prefixo em comum ("portaria" × "portaria normativa").
+_KW_RES = {p: re.compile(re.escape(p), re.IGNORECASE) for p in KEYWORDS}
+
 MESES = {
     "JAN": "01", "FEV": "02", "MAR": "03", "ABR": "04", "MAI": "05", "JUN": "06",
     "JUL": "07", "AGO": "08", "SET": "09", "OUT": "10", "NOV": "11", "DEZ": "12",
 }
 
+# Compilada uma vez no load do módulo; evita até o lookup no cache interno
+# do re a cada chamada. IGNORECASE dispensa o .upper() do título inteiro.
+_DATE_RE = re.compile(r"DE\s*(\d{1,2})([A-Z]{3})(\d{4})", re.IGNORECASE)
+
+# Extrai (href, título) dos links de boletim direto do HTML cru. A estrutura
+# dos links é trivial, então uma regex dispensa montar o DOM inteiro (um
+# objeto Tag por elemento, dict por atributo...) só para ler os <a>.
+_ANCHOR_RE = re.compile(
+    r'<a\b[^>]*\bhref="([^"]+)"[^>]*>([^<]{0,200}?BGSDS[^<]{0,200}?)</a>',
+    re.IGNORECASE,
+)
+
+@lru_cache(maxsize=4096)
 def parse_data(texto):
     """Extrai a data real do boletim no formato datetime."""
-    m = re.search(r"DE\s*(\d{1,2})([A-Z]{3})(\d{4})", texto.upper()) # Converte para upper antes de buscar
+    m = _DATE_RE.search(texto)
     if not m:
         return None
     dia = int(m.group(1))
-    mes_abrev = m.group(2)
+    mes_abrev = m.group(2).upper()
     ano = int(m.group(3))
     mes = MESES.get(mes_abrev)
     if not mes:
         return None
     return datetime(ano, int(mes), dia)
 
-def lista_boletins():
-    """Retorna lista de boletins ordenada por data."""
+def _carrega_etag():
+    try:
+        with open(ETAG_FILE, "r") as f:
+            return f.read().strip() or None
+    except Exception:
+        return None
+
+def _salva_etag(etag):
     try:
-        resp = requests.get(URL, timeout=60)
+        with open(ETAG_FILE, "w") as f:
+            f.write(etag)
+    except Exception:
+        pass
+
+async def lista_boletins(client, condicional=True):
+    """Retorna (boletins, etag) com o boletim mais recente em lista de 1 item.
+
+    boletins é None quando o site responde 304 (página não mudou desde a
+    última execução concluída) e [] quando a leitura falha ou nada é
+    encontrado. Com condicional=False o ETag salvo é ignorado e a página é
+    baixada sempre — para modos que reanalisam o boletim atual mesmo sem
+    novidade. O ETag da resposta NÃO é persistido aqui: quem salva é o
+    chamador, só depois de processar o boletim — senão um crash (ou um modo
+    que não atualiza estado) deixaria o 304 esconder um boletim nunca
+    anunciado.
+    """
+    headers = {}
+    etag = _carrega_etag() if condicional else None
+    if etag:
+        # GET condicional: se a página não mudou, o site devolve um 304 de
+        # poucos bytes em vez do HTML completo.
+        headers["If-None-Match"] = etag
+    try:
+        resp = await client.get(URL, headers=headers)
+        if resp.status_code == 304:
+            return None, None
         resp.raise_for_status()
     except Exception as e:
         print(f"Erro ao acessar o site: {e}")
-        return []
+        return [], None
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    boletins = []
+    novo_etag = resp.headers.get("ETag")
 
-    for a in soup.find_all("a"):
-        texto = a.get_text(strip=True)
-        if "BGSDS" not in texto:
-            continue
+    # main() só consome o boletim mais novo, então basta um máximo corrente:
+    # O(N) sem montar a lista completa nem ordenar.
+    mais_novo = None
+    for m in _ANCHOR_RE.finditer(resp.text):
+        href = m.group(1)
+        texto = m.group(2).strip()
         data = parse_data(texto)
         if not data:
             continue
-        href = a.get("href")
-        if not href:
-            continue
-        pdf_url = requests.compat.urljoin(URL, href)
-        boletins.append((data, texto, pdf_url))
+        if mais_novo is None or data > mais_novo[0]:
+            pdf_url = urljoin(URL, href)
+            mais_novo = (data, texto, pdf_url)
 
-    # Ordenar pela data real (mais recente primeiro)
-    boletins.sort(key=lambda x: x[0], reverse=True)
-    return boletins
+    return ([mais_novo] if mais_novo else []), novo_etag
 
 def carrega_ultimo():
-    if not os.path.exists(LAST_ID_FILE):
-        return None
+    # Lê o conteúdo ISO, não o mtime: o arquivo é persistido via commit no
+    # repositório e o checkout do CI reseta o mtime para a hora do checkout,
+    # o que faria toda execução achar que o boletim "de agora" já foi visto.
     try:
-        with open(LAST_ID_FILE, "r") as f:
+        with open(LAST_ID_FILE, "r", encoding="utf-8") as f:
             s = f.read().strip()
         return datetime.fromisoformat(s)
-    except Exception:
+    except Exception:  # inclui FileNotFoundError na primeira execução
         return None
 
 def salva_ultimo(data):
-    with open(LAST_ID_FILE, "w") as f:
-        f.write(data.isoformat())
+    # Escrita atômica: grava num temporário e renomeia por cima. Uma execução
+    # concorrente nunca lê o arquivo pela metade, e sem fsync — durabilidade
+    # total não é necessária para este cache.
+    tmp = LAST_ID_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data.isoformat().encode())
+    os.replace(tmp, LAST_ID_FILE)
 
-def envia_telegram(mensagem):
+async def envia_telegram(client, mensagem):
     token = os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = os.getenv("TELEGRAM_CHAT_ID")
 
@@ -95,34 +180,166 @@ def envia_telegram(mensagem):
     }
 
     try:
-        resp = requests.post(url, json=payload, timeout=60)
+        # Serializa com orjson (nativo) em vez do json.dumps puro-Python que
+        # o httpx usaria; mesmo formato no fio.
+        resp = await client.post(
+            url,
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+        )
         resp.raise_for_status()
         print("Mensagem enviada para o Telegram com sucesso.")
     except Exception as e:
         print(f"Erro ao enviar Telegram: {e}")
 
-def baixa_pdf_texto(pdf_url: str) -> str:
-    resp = requests.get(pdf_url, timeout=120)
-    resp.raise_for_status()
-    with BytesIO(resp.content) as f:
-        reader = PdfReader(f)
+def _extrai_paginas(pdf_bytes: bytes, indices: range) -> list[str]:
+    """Extrai o texto de uma fatia de páginas (roda em processo filho)."""
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
         textos = []
-        for page in reader.pages:
+        for i in indices:
             try:
-                textos.append(page.extract_text() or "")
+                textos.append(pdf[i].get_textpage().get_text_range() or "")
             except Exception:
-                continue
-    return "\n".join(textos)
+                textos.append("")
+        return textos
+    finally:
+        pdf.close()
+
+def _cache_pdf_path(pdf_url):
+    chave = hashlib.sha256(pdf_url.encode()).hexdigest()
+    return os.path.join(PDF_CACHE_DIR, f"{chave}.txt")
+
+def _salva_cache_pdf(pdf_url, texto):
+    try:
+        os.makedirs(PDF_CACHE_DIR, exist_ok=True)
+        with open(_cache_pdf_path(pdf_url), "w", encoding="utf-8") as f:
+            f.write(texto)
+        _poda_cache_pdf()
+    except Exception:
+        pass
+
+def _poda_cache_pdf():
+    """Remove textos antigos do cache para ele não crescer sem limite."""
+    limite = time.time() - PDF_CACHE_MAX_IDADE
+    try:
+        for nome in os.listdir(PDF_CACHE_DIR):
+            caminho = os.path.join(PDF_CACHE_DIR, nome)
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+    except Exception:
+        pass
+
+def _extrai_texto(pdf_bytes: bytes) -> str:
+    """Extrai o texto de todas as páginas do PDF (roda fora do event loop)."""
+    # Só para descobrir o número de páginas; a extração em si roda abaixo.
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        n_paginas = len(pdf)
+    finally:
+        pdf.close()
+
+    nucleos = os.cpu_count() or 1
+    if n_paginas <= 8 or nucleos == 1:
+        # Boletim pequeno: o custo de subir processos não compensa.
+        return "\n".join(_extrai_paginas(pdf_bytes, range(n_paginas)))
+
+    # Cada página é independente, então a extração é dividida em fatias
+    # contíguas, uma por núcleo. O PDFium não é thread-safe, por isso cada
+    # processo filho abre sua própria cópia do documento.
+    passo = -(-n_paginas // nucleos)
+    fatias = [range(ini, min(ini + passo, n_paginas)) for ini in range(0, n_paginas, passo)]
+    with ProcessPoolExecutor(max_workers=len(fatias)) as ex:
+        partes = ex.map(_extrai_paginas, [pdf_bytes] * len(fatias), fatias)
+    return "\n".join(t for parte in partes for t in parte)
+
+async def baixa_pdf_texto(client, pdf_url: str) -> str:
+    # Se o envio ao Telegram falhou na execução anterior, o texto já
+    # extraído está no cache e evita baixar/reparsear o mesmo PDF.
+    cache_path = _cache_pdf_path(pdf_url)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    # Baixa em streaming: o PDF é copiado em blocos de 64 KiB direto para o
+    # buffer, sem materializar resp.content (que dobraria o pico de memória).
+    async with client.stream("GET", pdf_url, timeout=120) as resp:
+        resp.raise_for_status()
+        buf = BytesIO()
+        tamanho = resp.headers.get("Content-Length")
+        if tamanho and "Content-Encoding" not in resp.headers:
+            # Pré-aloca o buffer para evitar realocações durante a cópia.
+            # Com Content-Encoding o tamanho é do corpo comprimido e o
+            # aiter_bytes entrega bytes já descomprimidos, então não serve.
+            buf.truncate(int(tamanho))
+            buf.seek(0)
+        async for bloco in resp.aiter_bytes(64 * 1024):
+            buf.write(bloco)
+        # Apara a pré-alocação excedente; sem isso um corpo menor que o
+        # Content-Length deixaria NULs no fim e corromperia o parse.
+        buf.truncate(buf.tell())
+    pdf_bytes = buf.getvalue()
+
+    # A extração é CPU-bound; roda numa thread para não travar o event loop.
+    texto = await asyncio.to_thread(_extrai_texto, pdf_bytes)
+    _salva_cache_pdf(pdf_url, texto)
+    return texto
+
+def _procura_palavras(texto: str) -> dict:
+    # Sempre sobre KEYWORDS: os padrões são construídos a partir dela no
+    # load, então não há lista alternativa válida aqui.
+    return {p: bool(rx.search(texto)) for p, rx in _KW_RES.items()}
+
+async def _texto_parcial(client, pdf_url: str):
+    """Tenta extrair texto só do começo do PDF, via requisição Range.
+
+    Retorna (texto, completo). O parse da fatia só funciona com PDFs
+    linearizados (otimizados para web); nos demais falha e retornamos
+    (None, False) para o chamador cair no download completo. Se o servidor
+    ignorar o Range e responder 200, o PDF inteiro já chegou em memória —
+    extrai tudo, grava no cache e devolve completo=True em vez de jogar os
+    bytes fora e baixar de novo.
+    """
+    try:
+        resp = await client.get(
+            pdf_url,
+            headers={"Range": f"bytes=0-{PDF_CABECALHO_BYTES - 1}"},
+            timeout=60,
+        )
+        if resp.status_code == 200:
+            texto = await asyncio.to_thread(_extrai_texto, resp.content)
+            _salva_cache_pdf(pdf_url, texto)
+            return texto, True
+        if resp.status_code != 206:
+            return None, False
+        return await asyncio.to_thread(_extrai_texto, resp.content), False
+    except Exception:
+        return None, False
+
+async def busca_palavras_no_pdf(client, pdf_url: str) -> dict:
+    """Baixa o boletim e reporta quais KEYWORDS aparecem no texto."""
+    if not _KW_RES:
+        # Sem palavras configuradas não há o que procurar nem baixar.
+        return {}
 
-def busca_palavras_no_pdf(pdf_url: str, palavras: list[str]) -> dict:
     print(f"Baixando PDF para busca: {pdf_url}")
-    texto = baixa_pdf_texto(pdf_url)
-    texto_lower = texto.lower()
-    resultado = {}
-    for p in palavras:
-        p_norm = p.lower()
-        resultado[p] = p_norm in texto_lower
-    return resultado
+
+    # Tentativa barata: as palavras-chave costumam aparecer já nas primeiras
+    # páginas, então os primeiros 512 KiB podem bastar — só vale a pena se o
+    # texto completo ainda não estiver no cache em disco.
+    if not os.path.exists(_cache_pdf_path(pdf_url)):
+        texto, completo = await _texto_parcial(client, pdf_url)
+        if texto is not None:
+            resultado = _procura_palavras(texto)
+            if completo or all(resultado.values()):
+                # Texto completo, ou todas encontradas já no cabeçalho;
+                # o download integral é dispensável.
+                return resultado
+
+    texto = await baixa_pdf_texto(client, pdf_url)
+    return _procura_palavras(texto)
 
 def monta_resumo_palavras(resultado: dict) -> str:
     linhas = []
@@ -131,58 +348,114 @@ def monta_resumo_palavras(resultado: dict) -> str:
         linhas.append(f"• <b>{palavra}</b>: {status}")
     return "\n".join(linhas)
 
-def main():
-    boletins = lista_boletins()
-    
-    # Cabeçalho padrão da mensagem
-    mensagem_final = "<b>Relatório do Boletim Geral da SDS/PE</b>\n"
-    
-    # Se a lista falhar, envia a mensagem de erro.
-    if not boletins:
-        mensagem_final += "⚠️ Não foi possível ler a lista de boletins no site."
-        envia_telegram(mensagem_final) # Envia apenas em caso de erro na leitura do site
-        return
+async def main(mode="notify"):
+    """Roda o monitor no modo pedido.
 
-    data_nova, titulo_novo, pdf_url = boletins[0]
-    data_ultima = carrega_ultimo()
-
-    print(f"Mais recente no site: {titulo_novo} ({data_nova})")
-    print(f"Último salvo localmente: {data_ultima}")
-
-    print("Último PDF:", pdf_url)
-
-    # Verifica se há atualização
-    if data_ultima is None or data_nova > data_ultima:
-        # --- Lógica de NOVA ATUALIZAÇÃO ---
-        
-        # 1) Busca palavras-chave no PDF
-        resumo_palavras = ""
-        try:
-            resultado = busca_palavras_no_pdf(pdf_url, KEYWORDS)
-            resumo_palavras = monta_resumo_palavras(resultado)
-        except Exception as e:
-            resumo_palavras = f"⚠️ Erro ao analisar o PDF: {e}"
-
-        # 2) Monta o corpo da mensagem de sucesso
-        corpo_msg = (
-            f"✅ <b>Atualização encontrada!</b>\n\n"
-            f"<b>{titulo_novo}</b>\n"
-            f"📄 <a href=\"{pdf_url}\">Abrir PDF</a>\n\n"
-            f"<b>Busca de palavras-chave:</b>\n"
-            f"{resumo_palavras}"
-        )
-        
-        # 3) Atualiza o arquivo local com a data nova
-        salva_ultimo(data_nova)
-        
-        # 4) Envia a mensagem (SÓ AQUI, DENTRO DO IF)
-        mensagem_final += corpo_msg
-        envia_telegram(mensagem_final)
-    else:
-        # --- Lógica de SEM ATUALIZAÇÃO ---
-        # Não faz nada e o script termina sem enviar mensagem para o Telegram.
-        print("Boletim já processado. Nenhuma atualização para notificar.")
-        pass # Apenas passa
+    notify   — fluxo completo: detecta boletim novo, busca palavras-chave
+               e notifica no Telegram (padrão).
+    keywords — só baixa o boletim mais recente e imprime o resumo das
+               palavras-chave, sem Telegram e sem atualizar o estado local.
+    id-only  — detecta e notifica boletim novo sem analisar o PDF.
+    """
+    async with _novo_cliente() as client:
+        # No modo keywords o objetivo é reanalisar o boletim atual mesmo sem
+        # novidade, então o GET condicional (304) não se aplica.
+        boletins, novo_etag = await lista_boletins(client, condicional=(mode != "keywords"))
+
+        # 304: a página não mudou desde a última execução, nada a fazer.
+        if boletins is None:
+            print("Página de boletins não mudou (HTTP 304). Nenhuma atualização.")
+            return
+
+        # Cabeçalho padrão da mensagem
+        mensagem_final = "<b>Relatório do Boletim Geral da SDS/PE</b>\n"
+
+        # Se a lista falhar, envia a mensagem de erro (menos no modo
+        # keywords, que promete não falar com o Telegram: só imprime).
+        if not boletins:
+            mensagem_final += "⚠️ Não foi possível ler a lista de boletins no site."
+            if mode == "keywords":
+                print("Não foi possível ler a lista de boletins no site.")
+            else:
+                await envia_telegram(client, mensagem_final) # Envia apenas em caso de erro na leitura do site
+            return
+
+        data_nova, titulo_novo, pdf_url = boletins[0]
+        data_ultima = carrega_ultimo()
+
+        print(f"Mais recente no site: {titulo_novo} ({data_nova})")
+        print(f"Último salvo localmente: {data_ultima}")
+
+        print("Último PDF:", pdf_url)
+
+        # Modo keywords: analisa o boletim mais recente e imprime o resumo,
+        # sem mexer no estado local nem enviar Telegram.
+        if mode == "keywords":
+            resultado = await busca_palavras_no_pdf(client, pdf_url)
+            print(monta_resumo_palavras(resultado))
+            return
+
+        # Verifica se há atualização
+        if data_ultima is None or data_nova > data_ultima:
+            # --- Lógica de NOVA ATUALIZAÇÃO ---
+
+            resumo_palavras = ""
+            if mode != "id-only":
+                # 1) Busca palavras-chave no PDF; em paralelo, aquece a conexão
+                #    TLS com a API do Telegram enquanto o PDF baixa.
+                busca = asyncio.create_task(busca_palavras_no_pdf(client, pdf_url))
+                aquecimento = asyncio.create_task(client.head("https://api.telegram.org"))
+
+                try:
+                    resultado = await busca
+                    resumo_palavras = monta_resumo_palavras(resultado)
+                except Exception as e:
+                    resumo_palavras = f"⚠️ Erro ao analisar o PDF: {e}"
+
+                try:
+                    await aquecimento
+                except Exception:
+                    pass  # o aquecimento é melhor-esforço
+
+            # 2) Monta o corpo da mensagem de sucesso
+            corpo_msg = (
+                f"✅ <b>Atualização encontrada!</b>\n\n"
+                f"<b>{titulo_novo}</b>\n"
+                f"📄 <a href=\"{pdf_url}\">Abrir PDF</a>"
+            )
+            if mode != "id-only":
+                corpo_msg += (
+                    f"\n\n<b>Busca de palavras-chave:</b>\n"
+                    f"{resumo_palavras}"
+                )
+
+            # 3) Atualiza o estado local (data e ETag) — o ETag só agora, com
+            #    o boletim processado, para um 304 futuro ser seguro
+            salva_ultimo(data_nova)
+            if novo_etag:
+                _salva_etag(novo_etag)
+
+            # 4) Envia a mensagem (SÓ AQUI, DENTRO DO IF)
+            mensagem_final += corpo_msg
+            await envia_telegram(client, mensagem_final)
+        else:
+            # --- Lógica de SEM ATUALIZAÇÃO ---
+            # Não envia mensagem; só registra o ETag, já que o boletim desta
+            # página já foi processado e um 304 futuro não esconde nada.
+            print("Boletim já processado. Nenhuma atualização para notificar.")
+            if novo_etag:
+                _salva_etag(novo_etag)
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Monitor do Boletim Geral da SDS/PE")
+    parser.add_argument(
+        "--mode",
+        choices=("notify", "keywords", "id-only"),
+        default="notify",
+        help="notify: detecta e notifica com busca de palavras-chave (padrão); "
+             "keywords: só imprime o resumo das palavras-chave; "
+             "id-only: notifica boletim novo sem analisar o PDF",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.mode))